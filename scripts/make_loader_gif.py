@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
+import io
 import re
 import math
 from pathlib import Path
 
+try:
+    from PIL import Image
+except ImportError:  # optional: fall back to the pure-Python encoder below
+    Image = None
+
 ROOT = Path(__file__).resolve().parents[1]
 SVG_PATH = ROOT / 'client' / 'public' / 'P_logo.svg'
 OUT_PATH = ROOT / 'client' / 'public' / 'polycopy-loader.gif'
@@ -11,6 +17,12 @@ W = 240
 H = 240
 FRAMES = 25
 DELAY_CS = 4  # 40ms
+ANGLE_STEP = 2 * math.pi / FRAMES * 0.10  # logo rotation per frame, radians
+
+# fixed-point precision used by fill_polygon
+SUBPIXEL_BITS = 8
+SUBPIXEL_ONE = 1 << SUBPIXEL_BITS
+SUBPIXEL_HALF = SUBPIXEL_ONE >> 1
 
 # Palette indices:
 # 0 bg, 1 dim, 2 blue active, 3 white glow
@@ -21,6 +33,13 @@ PALETTE = [
     (255, 255, 255),
 ]
 
+PATH_D_RE = re.compile(r'<path[^>]*d="([^"]+)"')
+TOKEN_RE = re.compile(r'[MLCZmlcz]|-?\d*\.?\d+(?:e[-+]?\d+)?')
+CMD_SET = frozenset('MLCZmlcz')
+
+# one full row of each palette index, sliced to length for span fills
+FILL = [bytes([i]) * W for i in range(len(PALETTE))]
+
 
 def cubic(p0, p1, p2, p3, t):
     mt = 1.0 - t
@@ -31,17 +50,17 @@ def cubic(p0, p1, p2, p3, t):
 
 
 def parse_svg_paths(svg_text):
-    path_ds = re.findall(r'<path[^>]*d="([^"]+)"', svg_text)
     paths = []
-    for d in path_ds:
-        toks = re.findall(r'[MLCZmlcz]|-?\d*\.?\d+(?:e[-+]?\d+)?', d)
+    for d in PATH_D_RE.findall(svg_text):
+        # commands stay as strings, everything else is parsed to float once
+        toks = [t if t in CMD_SET else float(t) for t in TOKEN_RE.findall(d)]
         i = 0
         cmd = None
         cur = (0.0, 0.0)
         pts = []
         while i < len(toks):
             t = toks[i]
-            if re.fullmatch(r'[MLCZmlcz]', t):
+            if t in CMD_SET:
                 cmd = t
                 i += 1
                 if cmd in ('Z', 'z'):
@@ -49,19 +68,15 @@ def parse_svg_paths(svg_text):
                 continue
 
             if cmd in ('M', 'L'):
-                x = float(toks[i]); y = float(toks[i + 1]); i += 2
-                cur = (x, y)
+                cur = (toks[i], toks[i + 1]); i += 2
                 pts.append(cur)
                 if cmd == 'M':
                     cmd = 'L'
             elif cmd == 'C':
-                x1 = float(toks[i]); y1 = float(toks[i + 1])
-                x2 = float(toks[i + 2]); y2 = float(toks[i + 3])
-                x3 = float(toks[i + 4]); y3 = float(toks[i + 5]); i += 6
                 p0 = cur
-                p1 = (x1, y1)
-                p2 = (x2, y2)
-                p3 = (x3, y3)
+                p1 = (toks[i], toks[i + 1])
+                p2 = (toks[i + 2], toks[i + 3])
+                p3 = (toks[i + 4], toks[i + 5]); i += 6
                 steps = 18
                 for s in range(1, steps + 1):
                     pts.append(cubic(p0, p1, p2, p3, s / steps))
@@ -80,69 +95,96 @@ def transform_paths(paths):
     return [[(x * s + ox, y * s + oy) for x, y in poly] for poly in paths]
 
 
-def rotate_point(x, y, cx, cy, a):
-    sa = math.sin(a)
-    ca = math.cos(a)
-    dx, dy = x - cx, y - cy
-    return (cx + dx * ca - dy * sa, cy + dx * sa + dy * ca)
-
-
-def rotate_poly(poly, angle, cx, cy):
-    return [rotate_point(x, y, cx, cy, angle) for x, y in poly]
-
-
-def fill_polygon(buf, poly, color_idx):
-    ys = [p[1] for p in poly]
-    y_min = max(0, int(math.floor(min(ys))))
-    y_max = min(H - 1, int(math.ceil(max(ys))))
-    n = len(poly)
-    for y in range(y_min, y_max + 1):
-        scan_y = y + 0.5
-        xs = []
-        for i in range(n):
-            x1, y1 = poly[i]
-            x2, y2 = poly[(i + 1) % n]
-            if y1 == y2:
-                continue
-            if (y1 <= scan_y < y2) or (y2 <= scan_y < y1):
-                t = (scan_y - y1) / (y2 - y1)
-                xs.append(x1 + t * (x2 - x1))
-        xs.sort()
+def center_paths(paths, cx, cy):
+    return [[(x - cx, y - cy) for x, y in poly] for poly in paths]
+
+
+def fill_polygon(buf, poly, color_idx, sa, ca, cx, cy):
+    # poly is relative to (cx, cy) (see center_paths); each point is rotated
+    # by (sa, ca) as it is read rather than via a rotated copy of the polygon,
+    # then rounded to fixed point with SUBPIXEL_BITS of fraction so the
+    # scanline walk below is all integer arithmetic.
+    # edge table: (first scanline, end scanline, x1, numerator, numerator step,
+    # y2 - y1), where scanline y samples at y + 0.5 and its x is
+    # x1 + numerator // (y2 - y1)
+    ca *= SUBPIXEL_ONE
+    sa *= SUBPIXEL_ONE
+    cx *= SUBPIXEL_ONE
+    cy *= SUBPIXEL_ONE
+    edges = []
+    dx, dy = poly[-1]
+    x1, y1 = round(cx + dx * ca - dy * sa), round(cy + dx * sa + dy * ca)
+    for dx, dy in poly:
+        x2, y2 = round(cx + dx * ca - dy * sa), round(cy + dx * sa + dy * ca)
+        if y1 != y2:
+            lo, hi = (y1, y2) if y1 < y2 else (y2, y1)
+            y_start = max(0, (lo - SUBPIXEL_HALF + SUBPIXEL_ONE - 1) >> SUBPIXEL_BITS)
+            y_end = min(H, (hi - SUBPIXEL_HALF + SUBPIXEL_ONE - 1) >> SUBPIXEL_BITS)
+            if y_start < y_end:
+                ex = x2 - x1
+                num = ((y_start << SUBPIXEL_BITS) + SUBPIXEL_HALF - y1) * ex
+                edges.append((y_start, y_end, x1, num, ex << SUBPIXEL_BITS, y2 - y1))
+        x1, y1 = x2, y2
+    if not edges:
+        return
+    edges.sort()
+
+    fill = FILL[color_idx]
+    active = []
+    e = 0
+    for y in range(edges[0][0], max(edge[1] for edge in edges)):
+        while e < len(edges) and edges[e][0] == y:
+            _, y_end, x, num, step, ey = edges[e]
+            active.append([num, step, ey, x, y_end])
+            e += 1
+        active = [a for a in active if a[4] > y]
+        xs = sorted([a[3] + a[0] // a[2] for a in active])
         for j in range(0, len(xs) - 1, 2):
-            x_start = max(0, int(math.ceil(xs[j])))
-            x_end = min(W - 1, int(math.floor(xs[j + 1])))
+            x_start = max(0, (xs[j] + SUBPIXEL_ONE - 1) >> SUBPIXEL_BITS)
+            x_end = min(W - 1, xs[j + 1] >> SUBPIXEL_BITS)
             if x_end >= x_start:
                 row = y * W
-                for x in range(x_start, x_end + 1):
-                    buf[row + x] = color_idx
+                buf[row + x_start : row + x_end + 1] = fill[: x_end - x_start + 1]
+        for a in active:
+            a[0] += a[1]
 
 
 def build_frame(paths, frame_idx):
     # solid background
-    buf = [0] * (W * H)
+    buf = bytearray(W * H)
 
     cx, cy = W * 0.5, H * 0.5
-    angle = (2 * math.pi * frame_idx) / FRAMES * 0.10
-    active = int((frame_idx / FRAMES) * len(paths)) % len(paths)
-    prev = (active - 1) % len(paths)
+    angle = frame_idx * ANGLE_STEP
+    sa = math.sin(angle)
+    ca = math.cos(angle)
+
+    # per-path colour for this frame: dim, with the active path blue and the
+    # one before it glowing white
+    n = len(paths)
+    active = frame_idx * n // FRAMES % n
+    colors = [1] * n
+    colors[(active - 1) % n] = 3
+    colors[active] = 2
+
+    for poly, color in zip(paths, colors):
+        fill_polygon(buf, poly, color, sa, ca, cx, cy)
+
+    return bytes(buf)
 
-    for i, poly in enumerate(paths):
-        color = 1
-        if i == active:
-            color = 2
-        elif i == prev:
-            color = 3
-        rot_poly = rotate_poly(poly, angle, cx, cy)
-        fill_polygon(buf, rot_poly, color)
 
-    return buf
+def reset_table(children, used):
+    children[:used] = [-1] * used
 
 
-def lzw_compress(min_code_size, indices):
+def lzw_compress(min_code_size, indices, children):
     clear = 1 << min_code_size
     end = clear + 1
 
-    table = {bytes([i]): i for i in range(clear)}
+    # code table as a flat trie: children[code * clear + k] is the code for
+    # string(code) + k, or -1 if that string has not been seen yet. The
+    # caller owns the table and reuses it across frames; only the first
+    # next_code * clear entries can be dirty, and they are reset on CLEAR and
+    # before returning.
     next_code = end + 1
     code_size = min_code_size + 1
 
@@ -150,39 +192,42 @@ def lzw_compress(min_code_size, indices):
     cur = 0
     bits = 0
 
+    # codes are at most 12 bits, so one 7-byte flush keeps bits below 56
     def emit(code):
         nonlocal cur, bits
         cur |= (code << bits)
         bits += code_size
-        while bits >= 8:
-            out.append(cur & 0xFF)
-            cur >>= 8
-            bits -= 8
+        if bits >= 56:
+            out.extend((cur & 0xFFFFFFFFFFFFFF).to_bytes(7, 'little'))
+            cur >>= 56
+            bits -= 56
 
     emit(clear)
-    w = bytes([indices[0]])
+    w_code = indices[0]
     for k in indices[1:]:
-        wk = w + bytes([k])
-        if wk in table:
-            w = wk
+        nxt = children[w_code * clear + k]
+        if nxt != -1:
+            w_code = nxt
         else:
-            emit(table[w])
+            emit(w_code)
             if next_code < 4096:
-                table[wk] = next_code
+                children[w_code * clear + k] = next_code
                 next_code += 1
-                if next_code == (1 << code_size) and code_size < 12:
+                # the decoder lags one entry behind, so widen only once code
+                # (1 << code_size) itself has been assigned
+                if next_code > (1 << code_size) and code_size < 12:
                     code_size += 1
             else:
                 emit(clear)
-                table = {bytes([i]): i for i in range(clear)}
+                reset_table(children, next_code * clear)
                 next_code = end + 1
                 code_size = min_code_size + 1
-            w = bytes([k])
-    emit(table[w])
+            w_code = k
+    emit(w_code)
     emit(end)
+    reset_table(children, next_code * clear)
 
-    if bits > 0:
-        out.append(cur & 0xFF)
+    out.extend(cur.to_bytes((bits + 7) // 8, 'little'))
     return bytes(out)
 
 
@@ -213,6 +258,8 @@ def write_gif(frames):
     # loop forever
     out.extend(b'\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00')
 
+    min_code_size = 2
+    lzw_table = [-1] * (4096 << min_code_size)
     for frame in frames:
         # GCE: no transparency
         out.extend(b'\x21\xF9\x04')
@@ -224,23 +271,46 @@ def write_gif(frames):
         out.extend(b'\x2C')
         out.extend((0, 0, 0, 0, W & 0xFF, (W >> 8) & 0xFF, H & 0xFF, (H >> 8) & 0xFF, 0))
 
-        min_code_size = 2
         out.append(min_code_size)
-        compressed = lzw_compress(min_code_size, frame)
+        compressed = lzw_compress(min_code_size, frame, lzw_table)
         out.extend(subblocks(compressed))
 
     out.append(0x3B)
     return bytes(out)
 
 
+def write_gif_pillow(frames):
+    # encodes the same frames as write_gif, using Pillow's C LZW encoder
+    palette = [c for rgb in PALETTE for c in rgb]
+    images = []
+    for frame in frames:
+        img = Image.frombytes('P', (W, H), frame)
+        img.putpalette(palette)
+        images.append(img)
+
+    out = io.BytesIO()
+    images[0].save(
+        out,
+        format='GIF',
+        save_all=True,
+        append_images=images[1:],
+        duration=DELAY_CS * 10,
+        loop=0,
+        disposal=1,
+        optimize=False,
+    )
+    return out.getvalue()
+
+
 def main():
     svg = SVG_PATH.read_text(encoding='utf-8')
     paths = transform_paths(parse_svg_paths(svg))
     if not paths:
         raise RuntimeError('No paths parsed from SVG')
+    paths = center_paths(paths, W * 0.5, H * 0.5)
 
     frames = [build_frame(paths, i) for i in range(FRAMES)]
-    gif_data = write_gif(frames)
+    gif_data = write_gif_pillow(frames) if Image is not None else write_gif(frames)
     OUT_PATH.write_bytes(gif_data)
     print(f'Wrote {OUT_PATH} ({len(gif_data)} bytes)')
 
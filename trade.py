@@ -1,11 +1,27 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to requests' stdlib json decoding
+    orjson = None
 
 API_BASE = os.getenv("API_BASE", "http://localhost:4000")
 
+# Shared keep-alive session so every call reuses the same connection
+SESSION = requests.Session()
+SESSION.headers.update({"Accept": "application/json"})
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
 def get_json(url: str):
-    r = requests.get(url, timeout=30)
+    r = SESSION.get(url, timeout=30)
     r.raise_for_status()
+    if orjson is not None:
+        return orjson.loads(r.content)
     return r.json()
 
 def main():
@@ -21,21 +37,26 @@ def main():
     for e in entries:
       print(f"- rank={e.get('rank')} name={e.get('displayName')} address={e.get('address')}")
 
-    # 2) Pull history for first trader (if present)
+    # 2) Fetch history and overview for first trader (if present); both only
+    #    depend on the address, so the two requests run concurrently
     if entries:
         address = entries[0]["address"]
-        history_payload = get_json(f"{API_BASE}/api/analytics/trader/{address}/history")
-        history = history_payload.get("history", [])
-
-        print(f"\nHistory points for {address}: {len(history)}")
-        for p in history[:5]:
-            print(
-                f"  ts={p.get('timestamp')} pnl={p.get('pnl')} "
-                f"trades={p.get('tradeCount')} volume={p.get('notionalVolume')}"
-            )
-
-        # 3) Overview endpoint (profile + trades + pnl + portfolio)
-        overview = get_json(f"{API_BASE}/api/users/{address}/overview?period=all&limit=200")
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            f_hist = ex.submit(get_json, f"{API_BASE}/api/analytics/trader/{address}/history")
+            f_over = ex.submit(get_json, f"{API_BASE}/api/users/{address}/overview?period=all&limit=200")
+            history = f_hist.result().get("history", [])
+
+            print(f"\nHistory points for {address}: {len(history)}")
+            for p in history[:5]:
+                print(
+                    f"  ts={p.get('timestamp')} pnl={p.get('pnl')} "
+                    f"trades={p.get('tradeCount')} volume={p.get('notionalVolume')}"
+                )
+
+            # 3) Overview snapshot (profile + trades + pnl + portfolio);
+            #    waited on only after history is printed
+            overview = f_over.result()
+
         profile = overview.get("profile", {})
         pnl = overview.get("pnl", {})
         portfolio = overview.get("portfolio", {})